@@ -1,7 +1,9 @@
+from typing import List
+
 SYSTEM_PROMPT = """You are a financial analyst, and an expert in reading and performing numerical analysis on financial reports."""
 
-INITIAL_PROMPT = """
-I will provide financial data and a question about that data. Please respond with the following:
+INSTRUCTIONS = """
+I will provide financial data and one or more numbered questions about that data. For each question, please respond with the following:
 
 1. A mathematical function that calculates the answer using only these basic operations:
 - add(x, y): Returns x + y
@@ -22,9 +24,11 @@ Rules:
  - rounding: The number of decimal places to round the result to (e.g., 2 for two decimal places). Use 0 if no rounding is required.
  - multiplier: A number to multiply the result by (e.g., 100 for percentages). Use 1 if no multiplication is required.
 
-Give the output in a JSON format.
+Give the output in a JSON format: an object with an "answers" list containing one entry per question, in the same order as the questions.
+
+"""
 
-Example:
+FEWSHOT_EXAMPLE = """Example:
 pre_text:
 ```
 ['26 | 2009 annual report in fiscal 2008 , revenues in the credit union systems and services business segment increased 14% ( 14 % ) from fiscal 2007 .', 'all revenue components within the segment experienced growth during fiscal 2008 .', 'license revenue generated the largest dollar growth in revenue as episys ae , our flagship core processing system aimed at larger credit unions , experienced strong sales throughout the year .', 'support and service revenue , which is the largest component of total revenues for the credit union segment , experienced 34 percent growth in eft support and 10 percent growth in in-house support .', 'gross profit in this business segment increased $ 9344 in fiscal 2008 compared to fiscal 2007 , due primarily to the increase in license revenue , which carries the highest margins .', 'liquidity and capital resources we have historically generated positive cash flow from operations and have generally used funds generated from operations and short-term borrowings on our revolving credit facility to meet capital requirements .', 'we expect this trend to continue in the future .', 'the company 2019s cash and cash equivalents increased to $ 118251 at june 30 , 2009 from $ 65565 at june 30 , 2008 .', 'the following table summarizes net cash from operating activities in the statement of cash flows : 2009 2008 2007 .']
@@ -36,35 +40,67 @@ table:
 ```
 [['2008', 'year ended june 30 2009 2008', 'year ended june 30 2009 2008', 'year ended june 30 2009'], ['net income', '$ 103102', '$ 104222', '$ 104681'], ['non-cash expenses', '74397', '70420', '56348'], ['change in receivables', '21214', '-2913 ( 2913 )', '-28853 ( 28853 )'], ['change in deferred revenue', '21943', '5100', '24576'], ['change in other assets and liabilities', '-14068 ( 14068 )', '4172', '17495'], ['net cash from operating activities', '$ 206588', '$ 181001', '$ 174247']]
 ```
-question:
-what was the percentage change in the net cash from operating activities from 2008 to 2009
+questions:
+1. what was the percentage change in the net cash from operating activities from 2008 to 2009
+2. what was the change in non-cash expenses from 2008 to 2009
 
 {
-    "formula": "divide(subtract(206588, 181001), 181001)",
-    "formatting_instructions": {
-        "prefix": "",
-        "suffix": "%",
-        "rounding": 2,
-        "multiplier": 100
+    "answers": [
+        {
+            "formula": "divide(subtract(206588, 181001), 181001)",
+            "formatting_instructions": {
+                "prefix": "",
+                "suffix": "%",
+                "rounding": 2,
+                "multiplier": 100
+            }
+        },
+        {
+            "formula": "subtract(74397, 70420)",
+            "formatting_instructions": {
+                "prefix": "",
+                "suffix": "",
+                "rounding": 0,
+                "multiplier": 1
+            }
         }
+    ]
 }
 """
 
+# Static instructions and few-shot example. This block is sent verbatim ahead of
+# every question so that it forms an identical prefix the provider can cache;
+# anything that varies per entry belongs in format_question_prompt.
+INSTRUCTIONS_PREFIX = INSTRUCTIONS + FEWSHOT_EXAMPLE
+
+_CONTEXT_TEMPLATE = """pre_text:
+```
+{pre_text}
+```
+post_text:
+```
+{post_text}
+```
+table:
+```
+{table}
+```
+"""
+
+_QUESTIONS_TEMPLATE = """questions:
+{questions}
+"""
+
+def format_context_prompt(context: dict) -> str:
+    """Format the entry context shared by all of its questions."""
+    return _CONTEXT_TEMPLATE.format_map(context)
+
+def format_questions_prompt(questions: List[str]) -> str:
+    """Format the numbered questions that follow the entry context."""
+    return _QUESTIONS_TEMPLATE.format(
+        questions="\n".join(f"{i}. {question}" for i, question in enumerate(questions, 1))
+    )
+
 def format_question_prompt(context: dict) -> str:
-    """Format the question prompt with the given context."""
-    return f"""
-    pre_text: 
-    ```
-    {context['pre_text']}
-    ```
-    post_text:
-    ```
-    {context['post_text']}
-    ```
-    table:
-    ```
-    {context['table']}
-    ```
-    question:
-    {context['question']}
-"""
\ No newline at end of file
+    """Format the entry context and its numbered questions, which follow INSTRUCTIONS_PREFIX."""
+    return format_context_prompt(context) + format_questions_prompt(context['questions'])
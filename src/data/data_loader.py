@@ -1,7 +1,18 @@
+from dataclasses import dataclass
 from pathlib import Path
-import json
-from typing import Dict, List, Union
-import random
+import sys
+from typing import Dict, Iterator, List
+import ijson
+import numpy as np
+
+@dataclass(slots=True)
+class Entry:
+    """A document with its text, table and question-answer pairs."""
+    entry_id: str
+    pre_text: List[str]
+    post_text: List[str]
+    table: List[List[str]]
+    qa_pairs: List[Dict[str, str]]
 
 class DataLoader:
     def __init__(self, split: str = None, seed: int = 42):
@@ -17,61 +28,78 @@ class DataLoader:
         self.split = split
         self.seed = seed
     
-    def split_data(self, data: List[Dict], train_ratio: float = 0.8) -> tuple[List[Dict], List[Dict]]:
+    def _split_indices(self, n: int, train_ratio: float = 0.8) -> tuple[np.ndarray, np.ndarray]:
+        """Shuffle indices 0..n-1 with the seed and split them into training and test indices."""
+        indices = np.random.default_rng(self.seed).permutation(n)
+        split_idx = int(n * train_ratio)
+        return indices[:split_idx], indices[split_idx:]
+    
+    def split_data(self, data: List[Entry], train_ratio: float = 0.8) -> tuple[List[Entry], List[Entry]]:
         """Split data into training and test sets."""
-        random.seed(self.seed)
-        data_copy = data.copy()
-        random.shuffle(data_copy)
+        train_idx, test_idx = self._split_indices(len(data), train_ratio)
+        return [data[i] for i in train_idx], [data[i] for i in test_idx]
+    
+    def _build_entry(self, idx: int, item: Dict) -> Entry:
+        """Build an entry with an entry_id and its question-answer pairs from a raw item."""
+        # Creates IDs like entry_000, entry_001, etc., interned since they are shared across result records
+        entry_id = sys.intern(f"entry_{idx:04d}")
+        
+        # Collect all QA pairs for this entry
+        qa_list = []
+        
+        # Check for single QA pair
+        if 'qa' in item:
+            qa_list.append({
+                'question': item['qa']['question'], 
+                'answer': item['qa']['answer'],
+                'formula': item['qa']['program_re']
+            })
+        
+        # Check for multiple QA pairs (qa_0, qa_1)
+        for i in range(2):  # Assuming maximum of qa_0 and qa_1
+            qa_key = f'qa_{i}'
+            if qa_key in item:
+                qa_list.append({
+                    'question': item[qa_key]['question'],
+                    'answer': item[qa_key]['answer'],
+                    'formula': item[qa_key]['program_re'].replace('const_', '')
+                })
         
-        split_idx = int(len(data_copy) * train_ratio)
-        return data_copy[:split_idx], data_copy[split_idx:]
+        return Entry(
+            entry_id=entry_id,
+            pre_text=item['pre_text'],
+            post_text=item['post_text'],
+            table=item['table'],
+            qa_pairs=qa_list
+        )
+    
+    def _iter_entries(self) -> Iterator[Entry]:
+        """Stream entries from the JSON file one item at a time."""
+        with open(self.raw_data_path, 'rb') as f:
+            for idx, item in enumerate(ijson.items(f, 'item')):
+                yield self._build_entry(idx, item)
     
-    def load_data(self) -> List[Dict[str, Union[str, List[Dict[str, str]], str]]]:
+    def load_data(self) -> Iterator[Entry]:
         """
         Load text and tabular data with question-answer pairs from JSON file.
         Adds an entry_id to each item for tracking related questions.
+        
+        Entries are yielded one at a time so the raw file is never held in memory.
+        Splitting requires shuffling, so with a split set the entries are
+        collected first and only the requested half is yielded.
         """
         if not self.raw_data_path.exists():
             raise FileNotFoundError(f"Data file not found at {self.raw_data_path}")
-            
-        with open(self.raw_data_path, 'r') as f:
-            data = json.load(f)
         
-        entries = []
-        for idx, item in enumerate(data):
-            entry_id = f"entry_{idx:04d}"  # Creates IDs like entry_000, entry_001, etc.
-            
-            # Collect all QA pairs for this entry
-            qa_list = []
-            
-            # Check for single QA pair
-            if 'qa' in item:
-                qa_list.append({
-                    'question': item['qa']['question'], 
-                    'answer': item['qa']['answer'],
-                    'formula': item['qa']['program_re']
-                })
-            
-            # Check for multiple QA pairs (qa_0, qa_1)
-            for i in range(2):  # Assuming maximum of qa_0 and qa_1
-                qa_key = f'qa_{i}'
-                if qa_key in item:
-                    qa_list.append({
-                        'question': item[qa_key]['question'],
-                        'answer': item[qa_key]['answer'],
-                        'formula': item[qa_key]['program_re'].replace('const_', '')
-                    })
-            
-            entries.append({
-                'entry_id': entry_id,
-                'pre_text': item['pre_text'],
-                'post_text': item['post_text'],
-                'table': item['table'],
-                'qa_pairs': qa_list
-            })
-
         if self.split:
-            train_data, test_data = self.split_data(entries)
-            return train_data if self.split == 'train' else test_data
+            entries = list(self._iter_entries())
+            train_idx, test_idx = self._split_indices(len(entries))
+            for i in (train_idx if self.split == 'train' else test_idx):
+                yield entries[i]
+            return
         
-        return entries
\ No newline at end of file
+        yield from self._iter_entries()
+    
+    def load_list(self) -> List[Entry]:
+        """Load all entries into a list, for callers that need random access or len()."""
+        return list(self.load_data())
@@ -1,10 +1,13 @@
 # src/data/training_data_generator.py
-import json
 import random
+import re
 from pathlib import Path
 from typing import List, Dict
-from .data_loader import DataLoader
-from ..config.prompts import format_question_prompt
+from .data_loader import DataLoader, Entry
+from ..utils import json_utils
+from ..config.prompts import format_context_prompt, format_questions_prompt
+
+_NUMBER_RE = re.compile(r'-?(?:\d[\d,]*(?:\.\d+)?|\.\d+)')  # Numbers, optionally signed and with thousands separators
 
 class TrainingDataGenerator:
     def __init__(self, train_split: float = 0.8, seed: int = 42):
@@ -12,18 +15,26 @@ class TrainingDataGenerator:
         random.seed(seed)
         self.data_loader = DataLoader()
         
+    def _format_context(self, entry: Entry) -> str:
+        """Render the context shared by all questions of an entry."""
+        return format_context_prompt({
+            'pre_text': entry.pre_text,
+            'post_text': entry.post_text,
+            'table': entry.table
+        })
+    
     def generate_answer_json(self, question: str, answer: str) -> Dict:
         """Generate the answer JSON based on the question and answer."""
         # Common patterns to detect in questions
         is_percentage = 'percentage' in question.lower() or '%' in question
         is_currency = '$' in answer or 'dollars' in question.lower()
         
-        # Extract numbers from answer
-        numbers = [float(s) for s in answer.replace('$', '').replace('%', '').replace(',', '').split() if s.replace('.', '').isdigit()]
-        if not numbers:
+        # Extract the first number from answer
+        match = _NUMBER_RE.search(answer)
+        if not match:
             return None
             
-        result = numbers[0]
+        result = float(match.group(0).replace(',', ''))
         
         # Determine formatting
         formatting = {
@@ -43,7 +54,7 @@ class TrainingDataGenerator:
     
     def generate_training_data(self) -> tuple[List[Dict], List[Dict]]:
         """Generate training and testing datasets."""
-        entries = self.data_loader.load_data()
+        entries = self.data_loader.load_list()
         random.shuffle(entries)
         
         split_idx = int(len(entries) * self.train_split)
@@ -54,31 +65,24 @@ class TrainingDataGenerator:
         test_data = []
         
         for entry in train_entries:
-            for qa in entry['qa_pairs']:
-                text_input = format_question_prompt({
-                    'pre_text': entry['pre_text'],
-                    'post_text': entry['post_text'],
-                    'table': entry['table'],
-                    'question': qa['question']
-                })
+            # The context is shared by all questions of an entry, so render it once
+            context_prompt = self._format_context(entry)
+            for qa in entry.qa_pairs:
+                text_input = context_prompt + format_questions_prompt([qa['question']])
                 
                 answer_json = self.generate_answer_json(qa['question'], qa['answer'])
                 if answer_json:
                     train_data.append({
                         "text_input": text_input,
-                        "output": json.dumps(answer_json)
+                        "output": json_utils.dumps({"answers": [answer_json]})
                     })
         
         for entry in test_entries:
-            for qa in entry['qa_pairs']:
+            context_prompt = self._format_context(entry)
+            for qa in entry.qa_pairs:
                 test_data.append({
-                    'entry_id': entry['entry_id'],
-                    'text_input': format_question_prompt({
-                        'pre_text': entry['pre_text'],
-                        'post_text': entry['post_text'],
-                        'table': entry['table'],
-                        'question': qa['question']
-                    }),
+                    'entry_id': entry.entry_id,
+                    'text_input': context_prompt + format_questions_prompt([qa['question']]),
                     'expected_answer': qa['answer']
                 })
         
@@ -91,10 +95,10 @@ if __name__ == "__main__":
     # Save the data
     output_dir = Path(__file__).parent.parent.parent / "data"
     
-    with open(output_dir / "train_data.json", "w") as f:
-        json.dump(train_data, f, indent=2)
+    with open(output_dir / "train_data.json", "w", encoding="utf-8") as f:
+        f.write(json_utils.dumps(train_data))
         
-    with open(output_dir / "test_data.json", "w") as f:
-        json.dump(test_data, f, indent=2)
+    with open(output_dir / "test_data.json", "w", encoding="utf-8") as f:
+        f.write(json_utils.dumps(test_data))
     
     print(f"Generated {len(train_data)} training examples and {len(test_data)} test examples")
\ No newline at end of file
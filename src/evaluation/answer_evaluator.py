@@ -1,7 +1,11 @@
 from dataclasses import dataclass
 import re
+import numpy as np
 from typing import Tuple, Dict, List
 
+# Prefix (non-digit characters at the start), number, and suffix (non-digit characters at the end)
+_ANSWER_RE = re.compile(r'([^\d.-]*)(.*?)([^\d.]*)', re.DOTALL)
+
 @dataclass
 class ParsedAnswer:
     """Structured representation of a formatted number."""
@@ -45,16 +49,8 @@ class AnswerEvaluator:
         # Remove any whitespace
         answer = answer.strip()
         
-        # Extract prefix (any non-digit characters at start)
-        prefix_match = re.match(r'^[^\d.-]*', answer)
-        prefix = prefix_match.group(0) if prefix_match else ""
-        
-        # Extract suffix (any non-digit characters at end)
-        suffix_match = re.search(r'[^\d.]*$', answer)
-        suffix = suffix_match.group(0) if suffix_match else ""
-        
-        # Extract the number
-        number_str = answer[len(prefix):len(answer)-len(suffix)]
+        # Split into prefix, number and suffix in a single pass
+        prefix, number_str, suffix = _ANSWER_RE.fullmatch(answer).groups()
         try:
             number = float(number_str)
         except ValueError:
@@ -62,8 +58,9 @@ class AnswerEvaluator:
         
         # Count decimal places
         decimal_places = 0
-        if '.' in number_str:
-            decimal_places = len(number_str.split('.')[1])
+        dot = number_str.find('.')
+        if dot != -1:
+            decimal_places = len(number_str) - dot - 1
         
         return ParsedAnswer(
             raw_string=answer,
@@ -118,39 +115,37 @@ class AnswerEvaluator:
         if total == 0:
             return {}
         
-        format_counts = {
-            'prefix_match': 0,
-            'suffix_match': 0,
-            'decimal_places_match': 0
-        }
-        
-        total_smape = 0.0
-        valid_comparisons = 0
-        
+        # Parse every pair, skipping pairs that cannot be parsed, and count format matches
+        gen_values = []
+        exp_values = []
+        prefix_hits = suffix_hits = decimal_hits = 0
         for generated, expected in pairs:
             try:
-                results = self.compare_answers(generated, expected)
-                
-                # Track SMAPE
-                total_smape += results['smape']
-                valid_comparisons += 1
-                
-                # Track format matching
-                for key in format_counts:
-                    if results.get(key, False):
-                        format_counts[key] += 1
-                    
+                gen_parsed = self.parse_answer(generated)
+                exp_parsed = self.parse_answer(expected)
             except ValueError:
                 continue
+            
+            gen_values.append(gen_parsed.number)
+            exp_values.append(exp_parsed.number)
+            prefix_hits += gen_parsed.prefix == exp_parsed.prefix
+            suffix_hits += gen_parsed.suffix == exp_parsed.suffix
+            decimal_hits += gen_parsed.decimal_places == exp_parsed.decimal_places
         
-        # Calculate metrics
+        # Calculate metrics (rates are relative to all pairs, including unparseable ones)
         metrics = {
-            f"{key}_rate": count/total 
-            for key, count in format_counts.items()
+            'prefix_match_rate': prefix_hits / total,
+            'suffix_match_rate': suffix_hits / total,
+            'decimal_places_match_rate': decimal_hits / total
         }
         
-        # Add mean SMAPE
-        if valid_comparisons > 0:
-            metrics['mean_smape'] = total_smape / valid_comparisons
+        # Add mean SMAPE, computed over all parsed pairs at once
+        if gen_values:
+            gen_numbers = np.array(gen_values, dtype=np.float64)
+            exp_numbers = np.array(exp_values, dtype=np.float64)
+            denom = np.abs(gen_numbers) + np.abs(exp_numbers)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                smape = np.where(denom == 0, 0.0, 200 * np.abs(gen_numbers - exp_numbers) / denom)
+            metrics['mean_smape'] = float(smape.mean())
         
         return metrics
\ No newline at end of file
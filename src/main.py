@@ -1,14 +1,96 @@
 import asyncio
+from dataclasses import dataclass, asdict
 from pathlib import Path
-from typing import List, Dict
-import json
+from typing import Dict, List, Optional
 from tqdm import tqdm
 from datetime import datetime
 
-from data.data_loader import DataLoader
+from data.data_loader import DataLoader, Entry
 from models.llm_interface import LLMInterface, QuestionContext
 from models.answer_processor import AnswerProcessor
 from evaluation.answer_evaluator import AnswerEvaluator
+from utils import json_utils
+
+MAX_CONCURRENT_ENTRIES = 8  # Number of entries with an LLM request in flight at once
+QUOTA_RESYNC_INTERVAL = 50  # Entries between re-reads of the LLM interface's quota
+
+@dataclass(slots=True)
+class EntryResult:
+    """LLM responses and processed answers for the questions of one entry."""
+    entry_id: str
+    questions: List[str]
+    expected_answers: List[str]
+    llm_responses: List[str]
+    processed_answers: List[Optional[str]]
+
+class QuotaTracker:
+    """Tracks the remaining daily quota locally, re-syncing with the LLM interface periodically."""
+    
+    def __init__(self, llm: LLMInterface):
+        self.llm = llm
+        self.exhausted = False  # Set once a request is refused, so the rest are skipped like the old break
+        self.sync()
+    
+    def sync(self):
+        """Re-read the remaining daily quota to correct any drift."""
+        self.remaining = self.llm.get_remaining_quota()['daily_remaining']
+        self.since_sync = 0
+    
+    def acquire(self) -> bool:
+        """Reserve one request, returning False if the daily quota is used up."""
+        if self.exhausted:
+            return False
+        if self.since_sync >= QUOTA_RESYNC_INTERVAL:
+            self.sync()
+        if self.remaining < 1:
+            # Only the first refusal is reported
+            self.exhausted = True
+            print("\nDaily limit would be exceeded. Skipping all remaining uncached entries.")
+            return False
+        
+        self.remaining -= 1
+        self.since_sync += 1
+        return True
+
+async def _process_entry(entry: Entry, sem: asyncio.Semaphore, llm: LLMInterface, processor: AnswerProcessor, quota: QuotaTracker) -> Optional[EntryResult]:
+    """Query the LLM for one entry and process its answers. Returns None if the entry was skipped."""
+    async with sem:
+        try:
+            # Create context for LLM
+            context = QuestionContext(
+                pre_text=entry.pre_text,
+                post_text=entry.post_text,
+                table=entry.table,
+                questions=[qa['question'] for qa in entry.qa_pairs],
+                entry_id=entry.entry_id
+            )
+            
+            # Quota is only taken for requests that miss the response cache
+            llm_responses = await llm.get_answers(context, reserve=quota.acquire)
+            if llm_responses is None:
+                return None
+            
+            # Process each response
+            processed_answers = []
+            for response in llm_responses:
+                try:
+                    processed_answer = processor.process_answer(response)
+                    processed_answers.append(processed_answer)
+                except Exception as e:
+                    print(f"\nError processing answer: {str(e)}")
+                    processed_answers.append(None)
+            
+            return EntryResult(
+                entry_id=entry.entry_id,
+                questions=context.questions,
+                expected_answers=[qa['answer'] for qa in entry.qa_pairs],
+                llm_responses=llm_responses,
+                processed_answers=processed_answers
+            )
+            
+        except Exception as e:
+            print(f"\nError processing entry {entry.entry_id}: {str(e)}")
+            return None
 
 async def process_dataset():
     """Main function to process the dataset and evaluate results."""
@@ -21,83 +103,55 @@ async def process_dataset():
     
     # Load data
     print("Loading dataset...")
-    entries = data_loader.load_data()
+    entries = data_loader.load_list()
     
     # Calculate total requests needed
-    total_questions = sum(len(entry['qa_pairs']) for entry in entries)
+    total_questions = sum(len(entry.qa_pairs) for entry in entries)
     print(f"Dataset contains {len(entries)} entries with {total_questions} total questions")
     
-    # Check against daily limit
-    quota = llm.get_remaining_quota()
-    if total_questions > quota['daily_remaining']:
-        print(f"\nWARNING: Total questions ({total_questions}) exceed daily remaining quota ({quota['daily_remaining']})")
+    # Check against daily limit (all questions of an entry share one request)
+    quota = QuotaTracker(llm)
+    if len(entries) > quota.remaining:
+        print(f"\nWARNING: Total requests ({len(entries)}) exceed daily remaining quota ({quota.remaining})")
         proceed = input("Do you want to proceed with partial processing? (y/n): ")
         if proceed.lower() != 'y':
             return
     
-    # Store results
-    all_results = []
+    # Detailed results are appended one entry per line as entries complete
+    output_dir = Path(__file__).parent.parent / "results"
+    output_dir.mkdir(exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    
+    # Store (generated, expected) pairs for evaluation
+    evaluation_pairs = []
     processed_questions = 0
     
-    # Process each entry
+    # Process entries concurrently, bounded by the semaphore
     print("\nProcessing entries...")
-    try:
-        for entry in tqdm(entries):
-            try:
-                # Check if we would exceed daily limit
-                questions_in_entry = len(entry['qa_pairs'])
-                quota = llm.get_remaining_quota()
-                if questions_in_entry > quota['daily_remaining']:
-                    print("\nDaily limit would be exceeded. Stopping processing.")
-                    break
-                
-                # Create context for LLM
-                context = QuestionContext(
-                    pre_text=entry['pre_text'],
-                    post_text=entry['post_text'],
-                    table=entry['table'],
-                    questions=[qa['question'] for qa in entry['qa_pairs']],
-                    entry_id=entry['entry_id']
-                )
-                
-                llm_responses = await llm.get_answers(context)
+    sem = asyncio.Semaphore(MAX_CONCURRENT_ENTRIES)
+    tasks = [asyncio.create_task(_process_entry(entry, sem, llm, processor, quota)) for entry in entries]
+    with open(output_dir / f"detailed_results_{timestamp}.jsonl", "w", encoding="utf-8") as detailed_file:
+        try:
+            for task in tqdm(asyncio.as_completed(tasks), total=len(tasks)):
+                entry_results = await task
+                if entry_results is None:
+                    continue
                 
-                # Process each response
-                processed_answers = []
-                for response in llm_responses:
-                    try:
-                        processed_answer = processor.process_answer(response)
-                        processed_answers.append(processed_answer)
-                    except Exception as e:
-                        print(f"\nError processing answer: {str(e)}")
-                        processed_answers.append(None)
+                detailed_file.write(json_utils.dumps(asdict(entry_results)) + "\n")
+                detailed_file.flush()
                 
-                # Store results
-                entry_results = {
-                    'entry_id': entry['entry_id'],
-                    'questions': [qa['question'] for qa in entry['qa_pairs']],
-                    'expected_answers': [qa['answer'] for qa in entry['qa_pairs']],
-                    'llm_responses': llm_responses,
-                    'processed_answers': processed_answers
-                }
-                all_results.append(entry_results)
-                
-                processed_questions += questions_in_entry
-                
-            except Exception as e:
-                print(f"\nError processing entry {entry.get('entry_id', 'unknown')}: {str(e)}")
-    
-    except KeyboardInterrupt:
-        print("\nProcessing interrupted by user. Saving partial results...")
+                for expected, generated in zip(entry_results.expected_answers, entry_results.processed_answers):
+                    if generated is not None:
+                        evaluation_pairs.append((generated, expected))
+                processed_questions += len(entry_results.questions)
+        
+        except (KeyboardInterrupt, asyncio.CancelledError):
+            print("\nProcessing interrupted by user. Saving partial results...")
+            for task in tasks:
+                task.cancel()
     
     # Evaluate results
     print(f"\nEvaluating results for {processed_questions} processed questions...")
-    evaluation_pairs = []
-    for result in all_results:
-        for expected, generated in zip(result['expected_answers'], result['processed_answers']):
-            if generated is not None:
-                evaluation_pairs.append((generated, expected))
-    
     accuracies = evaluator.evaluate_batch(evaluation_pairs)
     
     # Print results
@@ -111,18 +165,10 @@ async def process_dataset():
             print(f"{metric}: {value:.2%}")
     
     # Save results
-    save_results(all_results, accuracies, processed_questions, total_questions)
+    save_results(output_dir, timestamp, accuracies, processed_questions, total_questions)
 
-def save_results(results: List[Dict], accuracies: Dict, processed: int, total: int):
-    """Save results to files."""
-    output_dir = Path(__file__).parent.parent / "results"
-    output_dir.mkdir(exist_ok=True)
-    
-    # Save detailed results
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    with open(output_dir / f"detailed_results_{timestamp}.json", "w") as f:
-        json.dump(results, f, indent=2)
-    
+def save_results(output_dir: Path, timestamp: str, accuracies: Dict, processed: int, total: int):
+    """Save accuracies and a summary; detailed results are streamed during processing."""
     # Save accuracies with metadata
     final_results = {
         'accuracies': accuracies,
@@ -134,20 +180,22 @@ def save_results(results: List[Dict], accuracies: Dict, processed: int, total: i
         }
     }
     
-    with open(output_dir / f"accuracies_{timestamp}.json", "w") as f:
-        json.dump(final_results, f, indent=2)
+    (output_dir / f"accuracies_{timestamp}.json").write_text(json_utils.dumps(final_results, indent=True), encoding="utf-8")
     
     # Create a summary file
-    with open(output_dir / f"summary_{timestamp}.txt", "w") as f:
-        f.write("Evaluation Results\n")
-        f.write("=================\n\n")
-        f.write(f"Processed {processed}/{total} questions ")
-        f.write(f"({processed/total*100:.1f}% complete)\n\n")
-        for metric, value in accuracies.items():
-            if metric == 'mean_smape':  # Changed from average_percentage_diff
-                f.write(f"{metric}: {value:.2f}%\n")
-            else:
-                f.write(f"{metric}: {value:.2%}\n")
+    summary = [
+        "Evaluation Results\n",
+        "=================\n\n",
+        f"Processed {processed}/{total} questions ",
+        f"({processed/total*100:.1f}% complete)\n\n"
+    ]
+    for metric, value in accuracies.items():
+        if metric == 'mean_smape':  # Changed from average_percentage_diff
+            summary.append(f"{metric}: {value:.2f}%\n")
+        else:
+            summary.append(f"{metric}: {value:.2%}\n")
+    
+    (output_dir / f"summary_{timestamp}.txt").write_text("".join(summary), encoding="utf-8")
 
 if __name__ == "__main__":
     # Run the main process
@@ -11,11 +11,20 @@ class FormattingInstructions:
 class AnswerFormatter:
     def parse_instructions(self, format_dict: Dict) -> FormattingInstructions:
         """Parse formatting instructions from dictionary into a structured object."""
+        rounding = format_dict.get('rounding', 2)
+        multiplier = format_dict.get('multiplier', 1.0)
+        
+        # bool is an int subclass but never a meaningful rounding or multiplier
+        if not isinstance(rounding, int) or isinstance(rounding, bool):
+            raise ValueError(f"Invalid rounding in formatting instructions: {rounding!r}")
+        if not isinstance(multiplier, (int, float)) or isinstance(multiplier, bool):
+            raise ValueError(f"Invalid multiplier in formatting instructions: {multiplier!r}")
+        
         return FormattingInstructions(
             prefix=format_dict.get('prefix', ''),
             suffix=format_dict.get('suffix', ''),
-            rounding=format_dict.get('rounding', 2),
-            multiplier=format_dict.get('multiplier', 1.0)
+            rounding=rounding,
+            multiplier=multiplier
         )
     
     def format_number(self, number: float, instructions: FormattingInstructions) -> str:
@@ -23,11 +32,5 @@ class AnswerFormatter:
         # Apply multiplier
         value = number * instructions.multiplier
         
-        # Round to specified decimal places
-        rounded_value = round(value, instructions.rounding)
-        
-        # Convert to string with proper decimal places
-        number_str = f"{{:.{instructions.rounding}f}}".format(rounded_value)
-        
-        # Combine with prefix and suffix
-        return f"{instructions.prefix}{number_str}{instructions.suffix}"
\ No newline at end of file
+        # Round to specified decimal places and combine with prefix and suffix
+        return f"{instructions.prefix}{value:.{instructions.rounding}f}{instructions.suffix}"
\ No newline at end of file
@@ -1,12 +1,22 @@
 import json
-import re
+from functools import lru_cache
+from typing import Dict
 from .expression_evaluator import ExpressionEvaluator
 from .answer_formatter import AnswerFormatter
+try:
+    from ..utils import json_utils
+except ImportError:  # Run from src/ (as main.py is), where models is a top-level package
+    from utils import json_utils
+
+# Shared by all processors so their memoized results carry across instances
+_EVALUATOR = ExpressionEvaluator()
+_FORMATTER = AnswerFormatter()
 
 class AnswerProcessor:
     def __init__(self):
-        self.evaluator = ExpressionEvaluator()
-        self.formatter = AnswerFormatter()
+        self.evaluator = _EVALUATOR
+        self.formatter = _FORMATTER
+        self._process_cached = lru_cache(maxsize=1024)(self._process_json)
     
     def _clean_llm_response(self, llm_response: str) -> str:
         """
@@ -18,14 +28,7 @@ class AnswerProcessor:
         Returns:
             Clean JSON string
         """
-        # Remove markdown code block formatting
-        cleaned = re.sub(r'```json\s*', '', llm_response)
-        cleaned = re.sub(r'\s*```', '', cleaned)
-        
-        # Remove any extra newlines and whitespace
-        cleaned = cleaned.strip()
-        
-        return cleaned
+        return json_utils.strip_code_fences(llm_response)
     
     def process_answer(self, llm_response: str) -> str:
         """
@@ -38,31 +41,35 @@ class AnswerProcessor:
             Formatted answer string
         """
         try:
-            # Clean the response
-            cleaned_response = self._clean_llm_response(llm_response)
-            
-            # Parse the JSON response
-            response_dict = json.loads(cleaned_response)
-            
-            # Extract formula and formatting instructions
-            formula = response_dict.get('formula')
-            format_dict = response_dict.get('formatting_instructions')
-            
-            if not formula or not format_dict:
-                raise ValueError("Missing required fields in LLM response")
-            
-            # Evaluate the mathematical expression
-            result = self.evaluator.evaluate(formula)
-            
-            # Parse formatting instructions and format the result
-            formatting = self.formatter.parse_instructions(format_dict)
-            formatted_result = self.formatter.format_number(result, formatting)
+            # Identical responses are only parsed, evaluated and formatted once
+            return self._process_cached(self._clean_llm_response(llm_response))
             
-            return formatted_result
-            
-        except json.JSONDecodeError as e:
-            raise ValueError(f"Invalid JSON format in LLM response: {str(e)}\nResponse was: {llm_response}")
+        except json.JSONDecodeError as e:  # Also raised by orjson, whose error subclasses it
+            raise ValueError(f"Invalid JSON format in LLM response\nResponse was: {llm_response}") from e
         except KeyError as e:
-            raise ValueError(f"Missing required field in LLM response: {str(e)}")
-        except Exception as e:
-            raise ValueError(f"Error processing answer: {str(e)}")
\ No newline at end of file
+            raise ValueError(f"Missing required field in LLM response: {e.args[0]}") from e
+    
+    def _process_json(self, cleaned_response: str) -> str:
+        """Parse a cleaned JSON response and process the answer object it holds."""
+        return self._process_dict(json_utils.loads(cleaned_response))
+    
+    def _process_dict(self, response_dict: Dict) -> str:
+        """Evaluate and format a parsed answer object."""
+        if not isinstance(response_dict, dict):
+            raise ValueError(f"Expected a JSON object in LLM response, got: {response_dict}")
+        
+        # Extract formula and formatting instructions
+        formula = response_dict.get('formula')
+        format_dict = response_dict.get('formatting_instructions')
+        
+        if not formula or not format_dict:
+            raise ValueError("Missing required fields in LLM response")
+        if not isinstance(formula, str) or not isinstance(format_dict, dict):
+            raise ValueError(f"Malformed fields in LLM response: {response_dict}")
+        
+        # Evaluate the mathematical expression
+        result = self.evaluator.evaluate(formula)
+        
+        # Parse formatting instructions and format the result
+        formatting = self.formatter.parse_instructions(format_dict)
+        return self.formatter.format_number(result, formatting)
@@ -1,55 +1,124 @@
-import re
+from functools import lru_cache
+import operator
+from typing import List, Tuple, Union
+
+# A parsed expression: a number, or an operation name with its argument nodes
+Node = Union[float, Tuple[str, list]]
+
+_PUNCTUATION = '(),'
+
+def _tokenize(expression: str) -> List[str]:
+    """Split an expression into names, numbers and punctuation in a single pass, skipping whitespace."""
+    tokens = []
+    start = None
+    for i, char in enumerate(expression):
+        if char in _PUNCTUATION or char.isspace():
+            if start is not None:
+                tokens.append(expression[start:i])
+                start = None
+            if char in _PUNCTUATION:
+                tokens.append(char)
+        elif start is None:
+            start = i
+    
+    if start is not None:
+        tokens.append(expression[start:])
+    return tokens
+
+def _divide(x: float, y: float) -> float:
+    return x / y if y != 0 else float('inf')
+
+def _greater(x: float, y: float) -> int:
+    return 1 if x > y else 0
+
+# The available mathematical operations; the operator builtins dispatch in C
+_OPS = {
+    'add': operator.add,
+    'subtract': operator.sub,
+    'multiply': operator.mul,
+    'divide': _divide,
+    'exp': operator.pow,
+    'greater': _greater
+}
 
 class ExpressionEvaluator:
+    operations = _OPS
+    
     def __init__(self):
-        # Define the available mathematical operations
-        self.operations = {
-            'add': lambda x, y: x + y,
-            'subtract': lambda x, y: x - y,
-            'multiply': lambda x, y: x * y,
-            'divide': lambda x, y: x / y if y != 0 else float('inf'),
-            'exp': lambda x, y: x ** y,
-            'greater': lambda x, y: 1 if x > y else 0
-        }
+        # Memoize single operations and whole expressions, which recur across answers
+        self._apply = lru_cache(maxsize=4096)(self._apply_operation)
+        self._evaluate_cached = lru_cache(maxsize=4096)(self._evaluate)
+    
+    def _apply_operation(self, func_name: str, *args: float) -> float:
+        """Apply a single named operation to its arguments."""
+        return self.operations[func_name](*args)
     
     def evaluate(self, expression: str) -> float:
         """
         Evaluates a nested function expression and returns the result.
         Example: "divide(subtract(9362.2, 9244.9), 9244.9)" -> 0.0127
         """
-        # Remove any whitespace
-        expression = expression.replace(" ", "")
-        
+        return self._evaluate_cached(expression)
+    
+    def _evaluate(self, expression: str) -> float:
+        """Evaluate an expression; whitespace is skipped by float() and the tokenizer."""
         # Base case: if it's a number, return it
         try:
             return float(expression)
         except ValueError:
             pass
         
-        # Find the first complete function call (no nested functions inside)
-        pattern = r'(\w+)\(([^()]+)\)'
-        while True:
-            match = re.search(pattern, expression)
-            if not match:
-                raise ValueError(f"Invalid expression format: {expression}")
-            
-            func_name = match.group(1)
-            args = match.group(2).split(',')
-            
-            if func_name not in self.operations:
-                raise ValueError(f"Unknown operation: {func_name}")
-            
+        # A bare number in parentheses, e.g. "(0.0127)", needs no parsing either
+        stripped = expression.strip()
+        if stripped.startswith('(') and stripped.endswith(')'):
             try:
-                # Convert arguments to float
-                args = [float(arg.strip()) for arg in args]
-                # Calculate result
-                result = self.operations[func_name](*args)
-                
-                # Replace the function call with its result in the original expression
-                expression = expression[:match.start()] + str(result) + expression[match.end():]
-                
-                # If no more functions, we're done
-                if '(' not in expression:
-                    return float(expression)
-            except Exception as e:
-                raise ValueError(f"Error evaluating {func_name}{tuple(args)}: {str(e)}")
+                return float(stripped[1:-1])
+            except ValueError:
+                pass
+        
+        # Parsed by hand rather than via ast.parse + compile: that costs ~3x more per new
+        # formula, would need its own node whitelist, and repeats are already cached above
+        tokens = _tokenize(expression)
+        tree, pos = self._parse(tokens, 0)
+        if pos != len(tokens):
+            raise ValueError(f"Invalid expression format: {expression}")
+        
+        try:
+            return float(self._eval(tree))
+        except ValueError:
+            raise
+        except Exception as e:
+            raise ValueError(f"Error evaluating {expression}: {str(e)}")
+    
+    def _parse(self, tokens: List[str], pos: int) -> Tuple[Node, int]:
+        """Parse a number or a function call starting at tokens[pos], returning the node and the next position."""
+        if pos >= len(tokens) or tokens[pos] in _PUNCTUATION:
+            raise ValueError(f"Invalid expression format: {''.join(tokens)}")
+        
+        token = tokens[pos]
+        if pos + 1 < len(tokens) and tokens[pos + 1] == '(':
+            if token not in self.operations:
+                raise ValueError(f"Unknown operation: {token}")
+            
+            # Parse comma-separated arguments up to the closing parenthesis
+            args = []
+            pos += 2
+            while True:
+                arg, pos = self._parse(tokens, pos)
+                args.append(arg)
+                if pos < len(tokens) and tokens[pos] == ',':
+                    pos += 1
+                elif pos < len(tokens) and tokens[pos] == ')':
+                    return (token, args), pos + 1
+                else:
+                    raise ValueError(f"Invalid expression format: {''.join(tokens)}")
+        
+        return float(token), pos + 1
+    
+    def _eval(self, node: Node) -> float:
+        """Evaluate a parsed expression tree."""
+        if isinstance(node, float):
+            return node
+        
+        func_name, args = node
+        return self._apply(func_name, *[self._eval(arg) for arg in args])
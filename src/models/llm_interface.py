@@ -1,17 +1,21 @@
 import os
-from typing import Dict, Optional, List
+from typing import Callable, Dict, Optional, List
 import google.generativeai as genai
 from dataclasses import dataclass
 from utils.env import load_environment
-from config.prompts import SYSTEM_PROMPT, INITIAL_PROMPT, format_question_prompt
+from utils.llm_cache import LLMCache
+from utils import json_utils
+from config.prompts import SYSTEM_PROMPT, INSTRUCTIONS_PREFIX, format_question_prompt
 import asyncio
 import time
+from collections import deque
 from datetime import date
 
 
 @dataclass
 class LLMConfig:
     """Configuration for the LLM model."""
+    model_name: str = "gemini-2.0-flash-exp"
     temperature: float = 0
     top_p: float = 0.95
     top_k: int = 40
@@ -53,14 +57,15 @@ class LLMInterface:
         # Initialize the model
         self.model = self._setup_model()
         
-        # Current chat session and entry tracking
-        self.current_chat = None
-        self.current_entry_id = None
+        # Optional on-disk response cache, enabled with LLM_CACHE=1
+        self.cache = LLMCache() if os.getenv("LLM_CACHE") == "1" else None
         
         # Rate limiting state
-        self.requests = []  # Timestamp of recent requests
+        self.requests = deque()  # Timestamp of recent requests, oldest first
         self.daily_requests = 0  # Count of requests today
+        self.pending_requests = 0  # Requests waiting on the rate limiter, not yet in daily_requests
         self.last_reset_date = date.today()
+        self.rate_limit_lock = asyncio.Lock()  # Serializes rate limit checks across concurrent entries
     
     def _setup_model(self):
         """Set up the Gemini model with configuration."""
@@ -73,123 +78,155 @@ class LLMInterface:
         }
         
         return genai.GenerativeModel(
-            model_name="gemini-2.0-flash-exp",
+            model_name=self.config.model_name,
             generation_config=generation_config,
             system_instruction=SYSTEM_PROMPT
         )
     
     def _create_new_chat_session(self):
-        """Create a new chat session with initial prompt."""
+        """Create a new chat session seeded with the static instructions prefix."""
         return self.model.start_chat(
             history=[
                 {
                     "role": "user",
-                    "parts": [INITIAL_PROMPT],
+                    "parts": [INSTRUCTIONS_PREFIX],
                 }
             ]
         )
     
-    def _should_create_new_chat(self, entry_id: str) -> bool:
-        """Determine if we should create a new chat session."""
-        return self.current_chat is None or self.current_entry_id != entry_id
+    def _evict_old_requests(self, current_time: float):
+        """Drop request timestamps that have left the one-minute window."""
+        while self.requests and current_time - self.requests[0] >= 60:
+            self.requests.popleft()
     
     async def _check_rate_limits(self):
         """Check and enforce rate limits."""
-        current_time = time.time()
-        current_date = date.today()
-        
-        # Reset daily counter if it's a new day
-        if current_date != self.last_reset_date:
-            self.daily_requests = 0
-            self.last_reset_date = current_date
-        
-        # Check daily limit
-        if self.daily_requests >= self.config.daily_limit:
-            raise Exception(f"Daily request limit of {self.config.daily_limit} reached")
-        
-        # Remove requests older than 1 minute
-        self.requests = [t for t in self.requests if current_time - t < 60]
-        
-        # If we've hit the rate limit, wait
-        if len(self.requests) >= self.config.rpm:
-            wait_time = 60 - (current_time - self.requests[0])
-            if wait_time > 0:
-                print(f"\nRate limit reached, waiting {wait_time:.1f} seconds...")
-                await asyncio.sleep(wait_time)
-        
-        # Add current request
-        self.requests.append(current_time)
-        self.daily_requests += 1
+        self.pending_requests += 1
+        try:
+            async with self.rate_limit_lock:
+                current_time = time.time()
+                current_date = date.today()
+                
+                # Reset daily counter if it's a new day
+                if current_date != self.last_reset_date:
+                    self.daily_requests = 0
+                    self.last_reset_date = current_date
+                
+                # Check daily limit
+                if self.daily_requests >= self.config.daily_limit:
+                    raise Exception(f"Daily request limit of {self.config.daily_limit} reached")
+                
+                # Remove requests older than 1 minute
+                self._evict_old_requests(current_time)
+                
+                # If we've hit the rate limit, wait
+                if len(self.requests) >= self.config.rpm:
+                    wait_time = 60 - (current_time - self.requests[0])
+                    if wait_time > 0:
+                        print(f"\nRate limit reached, waiting {wait_time:.1f} seconds...")
+                        await asyncio.sleep(wait_time)
+                        current_time = time.time()
+                
+                # Add current request
+                self.requests.append(current_time)
+                self.daily_requests += 1
+        finally:
+            self.pending_requests -= 1
 
-    async def _send_message_with_retry(self, prompt: str, retry_count: int = 0) -> str:
+    async def _send_message_with_retry(self, prompt: str) -> str:
         """Send message to LLM with retry logic for rate limit errors."""
-        try:
-            # Check rate limits before sending
-            await self._check_rate_limits()
-            
-            # Send the message
-            response = self.current_chat.send_message(prompt)
-            return response.text
-            
-        except Exception as e:
-            error_str = str(e).lower()
-            
-            # Check if it's a rate limit error (429)
-            if "429" in error_str or "resource exhausted" in error_str:
-                if retry_count < self.config.max_retries:
-                    # Calculate delay with exponential backoff
-                    delay = self.config.retry_delay * (2 ** retry_count)
-                    print(f"\nRate limit exceeded (429). Retrying in {delay} seconds... (Attempt {retry_count + 1}/{self.config.max_retries})")
-                    
-                    # Wait before retrying
-                    await asyncio.sleep(delay)
-                    
-                    # Clear the recent requests to reset rate limiting
-                    self.requests = []
-                    
-                    # Retry with incremented count
-                    return await self._send_message_with_retry(prompt, retry_count + 1)
-                else:
+        for attempt in range(self.config.max_retries + 1):
+            try:
+                # Check rate limits before sending
+                await self._check_rate_limits()
+                
+                # Each attempt gets a fresh chat session, as a failed stream leaves the session unusable
+                chat = self._create_new_chat_session()
+                
+                # Stream the response and collect chunks as they are generated
+                response = await chat.send_message_async(prompt, stream=True)
+                chunks = []
+                async for chunk in response:
+                    chunks.append(chunk.text)
+                return "".join(chunks)
+                
+            except Exception as e:
+                error_str = str(e).lower()
+                
+                # Re-raise anything that is not a rate limit error (429)
+                if "429" not in error_str and "resource exhausted" not in error_str:
+                    raise
+                
+                if attempt == self.config.max_retries:
                     raise Exception(f"Maximum retries ({self.config.max_retries}) exceeded for rate limit error")
-            else:
-                # Re-raise other errors
-                raise
+                
+                # Calculate delay with exponential backoff
+                delay = self.config.retry_delay * (2 ** attempt)
+                print(f"\nRate limit exceeded (429). Retrying in {delay} seconds... (Attempt {attempt + 1}/{self.config.max_retries})")
+                
+                # Wait before retrying
+                await asyncio.sleep(delay)
+                
+                # Clear the recent requests to reset rate limiting
+                self.requests.clear()
+
+    def _split_answers(self, response_text: str, num_questions: int) -> List[str]:
+        """Split a batched response into one JSON string per question."""
+        parsed = json_utils.loads(json_utils.strip_code_fences(response_text))
+        if isinstance(parsed, list):
+            answers = parsed
+        elif isinstance(parsed, dict) and 'answers' in parsed:
+            answers = parsed['answers']
+        else:
+            # A lone question is sometimes answered with a bare answer object
+            answers = [parsed] if num_questions == 1 else None
+        
+        # Malformed elements are left for AnswerProcessor to reject, costing only their own question
+        if not isinstance(answers, list) or len(answers) != num_questions:
+            raise ValueError(f"Expected {num_questions} answers in LLM response, got: {response_text}")
+        
+        return [json_utils.dumps(answer) for answer in answers]
 
-    async def get_answers(self, context: QuestionContext) -> List[str]:
+    async def get_answers(self, context: QuestionContext, reserve: Optional[Callable[[], bool]] = None) -> Optional[List[str]]:
         """
         Get answers for one or more questions from the same entry.
         
+        All questions of the entry are sent in a single request so the shared
+        context is only transmitted once.
+        
         Args:
             context: QuestionContext containing entry information and questions
+            reserve: Called before a request is actually sent (i.e. not for cache hits);
+                returning False skips the entry
             
         Returns:
-            List of JSON strings containing formulas and formatting instructions
+            List of JSON strings containing formulas and formatting instructions,
+            or None if reserve declined the request
         """
         try:
-            answers = []
+            prompt = format_question_prompt({
+                "pre_text": context.pre_text,
+                "post_text": context.post_text,
+                "table": context.table,
+                "questions": context.questions
+            })
             
-            # Check if we need a new chat session
-            if self._should_create_new_chat(context.entry_id):
-                self.current_chat = self._create_new_chat_session()
-                self.current_entry_id = context.entry_id
+            # Reuse a previous response for an identical prompt if caching is enabled
+            if self.cache:
+                cache_key = LLMCache.make_key(SYSTEM_PROMPT, INSTRUCTIONS_PREFIX, prompt, self.config.model_name)
+                cached = await asyncio.to_thread(self.cache.get, cache_key)
+                if cached is not None:
+                    return cached
             
-            # Process each question
-            for i, question in enumerate(context.questions):
-                if i == 0:
-                    # First question: send full context
-                    prompt = format_question_prompt({
-                        "pre_text": context.pre_text,
-                        "post_text": context.post_text,
-                        "table": context.table,
-                        "question": question
-                    })
-                else:
-                    # Subsequent questions: send only the question
-                    prompt = f"question: {question}"
-                
-                # Send message with retry logic
-                response_text = await self._send_message_with_retry(prompt)
-                answers.append(response_text)
+            if reserve is not None and not reserve():
+                return None
+            
+            # Send message with retry logic
+            response_text = await self._send_message_with_retry(prompt)
+            answers = self._split_answers(response_text, len(context.questions))
+            
+            if self.cache:
+                await asyncio.to_thread(self.cache.set, cache_key, answers)
             
             return answers
             
@@ -198,18 +235,18 @@ class LLMInterface:
     
     def get_remaining_quota(self) -> Dict[str, int]:
         """Get remaining request quotas."""
+        # Requests already on their way through the rate limiter count against the quota
         current_date = date.today()
         if current_date != self.last_reset_date:
             return {
-                "daily_remaining": self.config.daily_limit,
+                "daily_remaining": self.config.daily_limit - self.pending_requests,
                 "minute_remaining": self.config.rpm
             }
         
         # Clean up old requests
-        current_time = time.time()
-        self.requests = [t for t in self.requests if current_time - t < 60]
+        self._evict_old_requests(time.time())
         
         return {
-            "daily_remaining": self.config.daily_limit - self.daily_requests,
+            "daily_remaining": self.config.daily_limit - self.daily_requests - self.pending_requests,
             "minute_remaining": self.config.rpm - len(self.requests)
         }
\ No newline at end of file
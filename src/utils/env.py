@@ -1,9 +1,11 @@
+from functools import lru_cache
 from pathlib import Path
 from dotenv import load_dotenv
 import os
 
+@lru_cache(maxsize=1)
 def load_environment():
-    """Load environment variables from .env file."""
+    """Load environment variables from .env file (once; see load_environment.cache_clear)."""
     env_path = Path(__file__).parent.parent.parent / '.env'
     load_dotenv(env_path)
     
@@ -0,0 +1,38 @@
+import json
+import re
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:  # Fall back to the standard library encoder
+    orjson = None
+
+_FENCES_RE = re.compile(r'\s*```(?:json\s*)?')  # Markdown code block fences and surrounding whitespace
+
+def dumps(obj: Any, indent: bool = False) -> str:
+    """Serialize obj to a JSON string, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0).decode()
+    return json.dumps(obj, indent=2 if indent else None)
+
+def loads(data: Union[str, bytes]) -> Any:
+    """Deserialize a JSON string, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def strip_code_fences(text: str) -> str:
+    """Remove markdown code block fences (```json ... ```) and surrounding whitespace from an LLM response."""
+    cleaned = text.strip()
+    
+    # Fast path for the usual shape: the whole response is one fenced block
+    if cleaned.startswith('```'):
+        cleaned = cleaned[3:].removeprefix('json').lstrip()
+    if cleaned.endswith('```'):
+        cleaned = cleaned[:-3].rstrip()
+    
+    # Fall back to the pattern for fences anywhere else
+    if '```' in cleaned:
+        cleaned = _FENCES_RE.sub('', cleaned).strip()
+    
+    return cleaned
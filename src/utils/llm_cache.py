@@ -0,0 +1,42 @@
+from pathlib import Path
+import hashlib
+import json
+import sqlite3
+import threading
+from typing import List, Optional
+
+class LLMCache:
+    def __init__(self, db_path: Optional[Path] = None):
+        """
+        Initialize the on-disk cache of LLM responses.
+
+        Args:
+            db_path: Location of the SQLite database, defaults to data/llm_cache.sqlite
+        """
+        project_root = Path(__file__).parent.parent.parent
+        self.db_path = db_path or project_root / "data" / "llm_cache.sqlite"
+        # Calls may come from worker threads, so share one connection behind a lock
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.conn.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, response TEXT)")
+        self.conn.commit()
+
+    @staticmethod
+    def make_key(*parts: str) -> str:
+        """Build a cache key from everything that determines the LLM output."""
+        return hashlib.sha256("\x00".join(parts).encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[List[str]]:
+        """Return the cached responses for a key, or None on a miss."""
+        with self.lock:
+            row = self.conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key: str, responses: List[str]):
+        """Store the responses for a key."""
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response) VALUES (?, ?)",
+                (key, json.dumps(responses))
+            )
+            self.conn.commit()